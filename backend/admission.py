@@ -0,0 +1,176 @@
+import heapq, itertools, math, threading, time
+from collections import Counter
+from flask import Blueprint, g, jsonify, request, session
+from config import ADMIT_SLOTS, RATE_PER_SEC, RATE_BURST
+
+bp = Blueprint("admission", __name__, url_prefix="/api")
+
+# class -> (priority, max seconds a request may wait for a slot); lower priority wins
+CLASSES = {
+    "cheap":     (0, 2.0),
+    "normal":    (1, 1.0),
+    "expensive": (2, 0.5),
+}
+
+# endpoint -> (class, max concurrent requests for that endpoint or None)
+ROUTES = {
+    "auth.me":             ("cheap", None),
+    "social.is_following": ("cheap", None),
+    "social.feed":         ("expensive", 4),
+    "social.search":       ("expensive", 3),
+    "pins.add_pin":        ("expensive", 3),
+    "transfer.export_board": ("expensive", 2),
+    "transfer.export_user":  ("expensive", 2),
+    "transfer.import_board": ("expensive", 2),
+    "transfer.import_user":  ("expensive", 2),
+}
+DEFAULT_ROUTE = ("normal", None)
+EXEMPT = {"static"}                  # no rate limit, no slot
+NO_SLOT = {"admission.stats_view"}   # rate limited, but never queues for a db slot
+
+_cond = threading.Condition()
+_inflight = Counter()        # endpoint -> running requests
+_waiting = []                # heap of (priority, seq, endpoint) of queued requests
+_head = None                 # cached _next_up(); recomputed only after a state change
+_dirty = True
+_seq = itertools.count()
+_buckets: dict = {}          # user key -> (tokens, last refill)
+_prune_at = 10_000           # bucket count that triggers the next prune
+stats = Counter()            # per class: admitted, rejected.queue and wait_ms over both
+
+
+def _take_token(key):
+    """Per-user token bucket; returns 0 if allowed, else seconds until a token."""
+    global _prune_at
+    now = time.monotonic()
+    with _cond:
+        if len(_buckets) > _prune_at:   # drop idle users so the dict can't grow forever
+            for k in [k for k, (_, t) in _buckets.items() if now - t > 60]:
+                del _buckets[k]
+            # next scan only once the dict has doubled, so busy periods stay O(1) amortised
+            _prune_at = max(10_000, 2 * len(_buckets))
+        tokens, last = _buckets.get(key, (RATE_BURST, now))
+        tokens = min(RATE_BURST, tokens + (now - last) * RATE_PER_SEC)
+        if tokens < 1:
+            _buckets[key] = (tokens, now)
+            return (1 - tokens) / RATE_PER_SEC
+        _buckets[key] = (tokens - 1, now)
+        return 0
+
+
+def _has_room(ep):
+    limit = ROUTES.get(ep, DEFAULT_ROUTE)[1]
+    return limit is None or _inflight[ep] < limit
+
+
+def _next_up():
+    """Best waiting (priority, seq) whose endpoint still has room, else None.
+       Cached so a wakeup storm costs one scan, not one per waiter."""
+    global _head, _dirty
+    if _dirty:
+        if _waiting and _has_room(_waiting[0][2]):
+            _head = _waiting[0][:2]
+        else:   # heap top is capped by its route limit; look further down
+            _head = next((w[:2] for w in sorted(_waiting) if _has_room(w[2])), None)
+        _dirty = False
+    return _head
+
+
+def _unqueue(me):
+    global _dirty
+    if _waiting[0] == me:
+        heapq.heappop(_waiting)
+    else:
+        _waiting.remove(me)
+        heapq.heapify(_waiting)
+    _dirty = True
+
+
+def _acquire(ep, prio, max_wait):
+    global _dirty
+    deadline = time.monotonic() + max_wait
+    me = (prio, next(_seq), ep)
+    with _cond:
+        heapq.heappush(_waiting, me)
+        _dirty = True
+        while not (sum(_inflight.values()) < ADMIT_SLOTS and _next_up() == me[:2]):
+            left = deadline - time.monotonic()
+            if left <= 0:
+                _unqueue(me)
+                _cond.notify_all()
+                return False
+            _cond.wait(left)
+        _unqueue(me)
+        _inflight[ep] += 1
+        if _waiting and sum(_inflight.values()) < ADMIT_SLOTS:
+            _cond.notify_all()   # more than one slot may have freed up; pass it on
+        return True
+
+
+def _count(*keys, n=1):
+    with _cond:
+        for k in keys:
+            stats[k] += n
+
+
+def _reject(status, retry_after, reason):
+    _count(f"rejected.{reason}", f"{request.endpoint}.rejected.{reason}")
+    resp = jsonify(error="too many requests" if status == 429 else "server busy")
+    resp.status_code = status
+    resp.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return resp
+
+
+def admit():
+    ep = request.endpoint
+    if ep is None or ep in EXEMPT or request.method == "OPTIONS":
+        return None   # CORS preflights are answered without touching the db
+
+    wait = _take_token(session.get("uid") or request.remote_addr)
+    if wait:
+        return _reject(429, wait, "rate")
+    if ep in NO_SLOT:
+        return None
+
+    cls, _ = ROUTES.get(ep, DEFAULT_ROUTE)
+    prio, max_wait = CLASSES[cls]
+    t0 = time.monotonic()
+    admitted = _acquire(ep, prio, max_wait)
+    _count(f"{cls}.wait_ms", n=int((time.monotonic() - t0) * 1000))
+    if not admitted:
+        _count(f"{cls}.rejected.queue")
+        return _reject(503, max_wait, "queue")
+    g.admitted = ep
+    _count("admitted", f"{ep}.admitted", f"{cls}.admitted")
+    return None
+
+
+def _release(ep):
+    global _dirty
+    with _cond:
+        _inflight[ep] -= 1
+        _dirty = True
+        _cond.notify_all()
+
+
+def release(_exc):
+    ep = g.pop("admitted", None)
+    if ep is not None:
+        _release(ep)
+
+
+def init_app(app):
+    """Register the hooks. Call before app.teardown_appcontext(release_conn) so the
+       slot is given back only after the db connection is back in the pool."""
+    app.before_request(admit)
+    app.teardown_appcontext(release)
+    app.register_blueprint(bp)
+
+
+@bp.get("/admission/stats")
+def stats_view():
+    with _cond:   # copy only; serialise outside the scheduler lock
+        counters = dict(stats)
+        inflight = {k: v for k, v in _inflight.items() if v}
+        queued = len(_waiting)
+    return jsonify(counters=counters, inflight=inflight, queued=queued, slots=ADMIT_SLOTS)
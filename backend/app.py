@@ -5,6 +5,7 @@ from flask_cors import CORS
 from flask import Flask
 from db import init_pool, release_conn
 from config import UPLOAD_FOLDER
+import admission, responses
 import os
 
 
@@ -42,6 +43,8 @@ app.config["UPLOAD_FOLDER"] = str(UPLOAD_FOLDER)
 CORS(app, supports_credentials=True)
 
 init_pool()
+admission.init_app(app)        # before release_conn: its teardown must run last
+responses.init_app(app)
 app.teardown_appcontext(release_conn)
 
 # blueprints
@@ -49,8 +52,9 @@ from auth import bp as auth_bp
 from boards import bp as boards_bp
 from pins import bp as pins_bp
 from social import bp as social_bp
+from transfer import bp as transfer_bp
 
-for bp in (auth_bp, boards_bp, pins_bp, social_bp):
+for bp in (auth_bp, boards_bp, pins_bp, social_bp, transfer_bp):
     app.register_blueprint(bp)
 
 if __name__ == "__main__":
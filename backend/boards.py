@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, session
 from db import run
+from responses import bump, conditional
 
 bp = Blueprint("boards", __name__, url_prefix="/api")
 
@@ -16,13 +17,14 @@ def create_board():
            RETURNING board_id,name,description""",
         (uid, body["name"], body.get("description", "")),
         fetchone=True,
-        commit=True,
+        primary=True,
     )
+    bump("user_boards", uid)
     return jsonify(board), 201
 
 
 @bp.get("/users/<int:uid>/boards")
 def list_boards(uid):
-    rows = run("SELECT board_id,name,description FROM boards WHERE user_id=%s", (uid,))
-    return jsonify(rows)
+    return conditional("user_boards", uid, lambda: run(
+        "SELECT board_id,name,description FROM boards WHERE user_id=%s", (uid,)))
 
@@ -12,3 +12,28 @@ DB_SETTINGS = dict(
     port=int(os.getenv("DB_PORT", "5432")),
     database=os.getenv("DB_NAME", "pin-project"),
 )
+
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+
+# read replicas, e.g. DB_REPLICAS="replica1:5433,replica2:5434"
+DB_REPLICAS = [
+    dict(DB_SETTINGS, host=host, port=int(port or 5432))
+    for host, _, port in (
+        h.strip().partition(":") for h in os.getenv("DB_REPLICAS", "").split(",") if h.strip()
+    )
+]
+REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))     # seconds behind primary
+REPLICA_LAG_TTL = float(os.getenv("DB_REPLICA_LAG_TTL", "2"))     # how often to re-check lag
+# read-your-writes window; a replica can be up to MAX_LAG + LAG_TTL behind when
+# picked, so anything shorter would let a user miss their own write
+STICKY_PRIMARY_SECS = max(float(os.getenv("DB_STICKY_SECS", "0")),
+                          REPLICA_MAX_LAG + REPLICA_LAG_TTL)
+
+# NDJSON import limits (see transfer.py)
+MAX_IMPORT_BYTES = int(os.getenv("MAX_IMPORT_BYTES", str(1024 ** 3)))
+MAX_IMPORT_LINE_BYTES = int(os.getenv("MAX_IMPORT_LINE_BYTES", str(1024 ** 2)))
+
+# admission control (see admission.py)
+ADMIT_SLOTS = int(os.getenv("ADMIT_SLOTS", str(DB_POOL_MAX)))   # requests allowed to hold a db conn
+RATE_PER_SEC = float(os.getenv("RATE_PER_SEC", "10"))           # per-user token bucket refill
+RATE_BURST = float(os.getenv("RATE_BURST", "20"))               # per-user token bucket size
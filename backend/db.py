@@ -1,20 +1,73 @@
+import logging, threading, time
 import psycopg2, psycopg2.pool
 from psycopg2.extras import RealDictCursor
-from flask import g
-from config import DB_SETTINGS
+from flask import g, session
+from config import (DB_SETTINGS, DB_POOL_MAX, DB_REPLICAS, REPLICA_MAX_LAG, REPLICA_LAG_TTL,
+                    STICKY_PRIMARY_SECS)
 
-_pool: psycopg2.pool.SimpleConnectionPool | None = None
+_pool: psycopg2.pool.ThreadedConnectionPool | None = None
+_replicas: list[psycopg2.pool.ThreadedConnectionPool | None] = []   # None = down, retried later
+_lock = threading.Lock()   # guards _replicas (re)creation, _replica_retry_at, _replica_lag, _rr
+_replica_retry_at: dict[int, float] = {}
+REPLICA_RETRY_SECS = 30
+_replica_lag: dict[int, tuple[float, float]] = {}   # idx -> (checked_at, lag_secs)
+_rr = 0
+
+# replay lag in seconds; NULL (= infinitely behind) unless the wal receiver is
+# streaming, since a dead stream also makes receive and replay LSNs equal.
+# Needs pg_read_all_stats (or superuser) to see pg_stat_wal_receiver.status.
+_LAG_SQL = """SELECT CASE WHEN w.status IS DISTINCT FROM 'streaming' THEN NULL
+                          WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                          ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+                     END AS lag
+              FROM (SELECT 1) one
+              LEFT JOIN pg_stat_wal_receiver w ON true"""
+
+
+def _make_pool(settings):
+    return psycopg2.pool.ThreadedConnectionPool(
+        minconn=1,
+        maxconn=DB_POOL_MAX,
+        cursor_factory=RealDictCursor,
+        **settings,
+    )
 
 
 def init_pool():
     global _pool
     if _pool is None:
-        _pool = psycopg2.pool.SimpleConnectionPool(
-            minconn=1,
-            maxconn=10,
-            cursor_factory=RealDictCursor,
-            **DB_SETTINGS,
-        )
+        _pool = _make_pool(DB_SETTINGS)
+        _replicas.extend([None] * len(DB_REPLICAS))
+        for idx in range(len(DB_REPLICAS)):
+            _replica_pool(idx)
+
+
+def _replica_pool(idx):
+    """Pool for replica `idx`, (re)connecting at most every REPLICA_RETRY_SECS.
+       A dead replica shouldn't stop the app, reads just fall back to primary."""
+    if _replicas[idx] is not None or time.monotonic() < _replica_retry_at.get(idx, 0):
+        return _replicas[idx]
+    with _lock:
+        if _replicas[idx] is None and time.monotonic() >= _replica_retry_at.get(idx, 0):
+            try:
+                _replicas[idx] = _make_pool(DB_REPLICAS[idx])
+            except psycopg2.OperationalError as e:
+                _replica_retry_at[idx] = time.monotonic() + REPLICA_RETRY_SECS
+                logging.warning("replica %s:%s unavailable, retrying in %ss: %s",
+                                DB_REPLICAS[idx]["host"], DB_REPLICAS[idx]["port"],
+                                REPLICA_RETRY_SECS, str(e).split("\n")[0])
+        return _replicas[idx]
+
+
+def run_ddl(sql):
+    """Run an idempotent statement on the primary at startup, outside any request."""
+    conn = _pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql)
+        conn.commit()
+    finally:
+        _pool.putconn(conn)
 
 
 def get_conn():
@@ -23,20 +76,97 @@ def get_conn():
     return g.db_conn
 
 
+def _replica_ok(idx, conn):
+    """True if replica `idx` is within REPLICA_MAX_LAG (cached for REPLICA_LAG_TTL)."""
+    with _lock:
+        checked_at, lag = _replica_lag.get(idx, (0.0, 0.0))
+    now = time.monotonic()
+    if now - checked_at > REPLICA_LAG_TTL:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(_LAG_SQL)
+                lag = cur.fetchone()["lag"]
+                lag = float("inf") if lag is None else float(lag)
+        except psycopg2.Error:
+            lag = float("inf")
+        with _lock:
+            _replica_lag[idx] = (now, lag)
+    return lag <= REPLICA_MAX_LAG
+
+
+def get_read_conn():
+    """Connection for a read: a healthy replica, or the primary if the user
+       wrote recently (read-your-writes) or no replica is usable."""
+    global _rr
+    if not _replicas or session.get("db_primary_until", 0) > time.time():
+        return get_conn()
+    if "db_read_conn" in g:
+        return g.db_read_conn
+
+    with _lock:
+        start = _rr
+    for i in range(len(_replicas)):
+        idx = (start + i) % len(_replicas)
+        pool = _replica_pool(idx)
+        if pool is None:
+            continue
+        try:
+            conn = pool.getconn()
+        except (psycopg2.pool.PoolError, psycopg2.OperationalError):
+            continue
+        if conn.closed or not _replica_ok(idx, conn):
+            pool.putconn(conn, close=bool(conn.closed))
+            continue
+        with _lock:
+            _rr = idx + 1
+        g.db_read_conn, g.db_read_idx = conn, idx
+        return conn
+    return get_conn()
+
+
 def release_conn(_exc):
     conn = g.pop("db_conn", None)
     if conn is not None:
         _pool.putconn(conn, close=False)
+    conn = g.pop("db_read_conn", None)
+    if conn is not None:
+        _replicas[g.pop("db_read_idx")].putconn(conn, close=False)
+
+
+def _drop_read_conn():
+    """Throw away this request's replica connection after it failed mid-read and
+       mark the replica as lagging so no one picks it until the next lag check."""
+    conn, idx = g.pop("db_read_conn"), g.pop("db_read_idx")
+    with _lock:
+        _replica_lag[idx] = (time.monotonic(), float("inf"))
+    _replicas[idx].putconn(conn, close=True)
+
+
+def commit_conn(conn):
+    """Commit on the primary and pin this session to it for STICKY_PRIMARY_SECS."""
+    conn.commit()
+    session["db_primary_until"] = time.time() + STICKY_PRIMARY_SECS
+
+
+def run(sql, params=None, fetchone=False, commit=False, primary=False):
+    """Thin wrapper around cursor execute.
+
+    Writes (commit=True) go to the primary and pin the session to it for
+    STICKY_PRIMARY_SECS; plain reads go to a replica unless primary=True."""
+    conn = get_conn() if commit or primary else get_read_conn()
+    try:
+        return _execute(conn, sql, params, fetchone, commit)
+    except psycopg2.OperationalError:
+        if conn is not g.get("db_read_conn"):
+            raise
+        _drop_read_conn()   # replica went away under us: retry the read on primary
+        return _execute(get_conn(), sql, params, fetchone, commit)
 
 
-def run(sql, params=None, fetchone=False, commit=False):
-    """Thin wrapper around cursor execute."""
-    conn = get_conn()
+def _execute(conn, sql, params, fetchone, commit):
     with conn.cursor() as cur:
         cur.execute(sql, params or ())
         if commit:
-            conn.commit()
+            commit_conn(conn)
         if cur.description:  # SELECT / RETURNING
             return cur.fetchone() if fetchone else cur.fetchall()
-        
-        
\ No newline at end of file
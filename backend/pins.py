@@ -1,6 +1,7 @@
 import requests
 from flask import Blueprint, request, jsonify, session
 from db import run
+from responses import bump, conditional
 from utils import allowed, save_upload
 from config import UPLOAD_FOLDER
 
@@ -49,7 +50,7 @@ def add_pin(bid):
            RETURNING pin_id""",
         (uid, bid, tags, src),
         fetchone=True,
-        commit=True,
+        primary=True,
     )["pin_id"]
 
     # save disk-file path (or blob) into Pictures
@@ -57,8 +58,9 @@ def add_pin(bid):
         """INSERT INTO pictures (pin_id, image_blob, uploaded_url)
            VALUES (%s, NULL, %s)""",
         (pin_id, f"/static/uploads/{img_fname}"),
-        commit=True,
+        primary=True,
     )
+    bump("board", bid)
     pin = {"pin_id": pin_id}
 
     return jsonify(pin), 201
@@ -66,7 +68,7 @@ def add_pin(bid):
 
 @bp.get("/boards/<int:bid>/pins")
 def list_pins(bid):
-    rows = run(
+    return conditional("board", bid, lambda: run(
         """SELECT p.pin_id,
                   p.tags AS description,
                   COALESCE(p.source_url,'') AS title,
@@ -76,8 +78,7 @@ def list_pins(bid):
            WHERE  p.board_id=%s
            ORDER BY p.pin_id DESC""",
         (bid,),
-    )
-    return jsonify(rows)
+    ))
 
 
 @bp.post("/pins/<int:pid>/repin")
@@ -91,7 +92,7 @@ def repin(pid):
         FROM   pins p
         LEFT JOIN pictures pic ON pic.pin_id=p.pin_id
         WHERE  p.pin_id=%s""",
-      (pid,), fetchone=True)
+      (pid,), fetchone=True, primary=True)
     
     if not pin:
         return jsonify(error="not found"), 404
@@ -100,7 +101,7 @@ def repin(pid):
            VALUES (%s,%s,%s,%s,%s) RETURNING pin_id""",
         (uid, target, pin["description"], pin["source_url"], pid),
         fetchone=True,
-        commit=True,
+        primary=True,
     )["pin_id"]
 
     # duplicate picture row so new pin_id has its own FK
@@ -108,8 +109,9 @@ def repin(pid):
         """INSERT INTO pictures (pin_id,image_blob,uploaded_url)
            VALUES (%s,NULL,%s)""",
         (new_pin_id, pin["uploaded_url"]),
-        commit=True,
+        primary=True,
     )
+    bump("board", target)
     new_pin = {"pin_id": new_pin_id}
 
     return jsonify(new_pin), 201
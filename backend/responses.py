@@ -0,0 +1,93 @@
+import gzip
+from flask import Response, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from db import run, run_ddl
+
+try:
+    import orjson
+except ImportError:   # stdlib json via DefaultJSONProvider
+    orjson = None
+
+try:
+    import brotli
+except ImportError:   # gzip only
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024
+
+# the only definition of this table: created here at startup so existing
+# databases pick it up without re-running the one-shot schema script
+_VERSIONS_DDL = """CREATE TABLE IF NOT EXISTS versions (
+                       kind VARCHAR(20) NOT NULL,
+                       id INT NOT NULL,
+                       version BIGINT NOT NULL DEFAULT 1,
+                       PRIMARY KEY (kind, id)
+                   )"""
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """jsonify() through orjson. Datetimes still go through Flask's default and
+       keys stay sorted, but non-ASCII text is sent as UTF-8 instead of \\u escapes."""
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=kwargs.get("default", self.default),
+                            option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def bump(kind, key, commit=True):
+    """Invalidate ETags of lists tagged (kind, key). Run the data writes with
+       primary=True and let this commit them, so both land or neither does."""
+    run("""INSERT INTO versions (kind,id,version) VALUES (%s,%s,1)
+           ON CONFLICT (kind,id) DO UPDATE SET version = versions.version + 1""",
+        (kind, key), commit=commit, primary=True)
+
+
+def conditional(kind, key, query):
+    """304 if the client's If-None-Match still matches (kind, key)'s version,
+       otherwise run `query()` and return its rows with a fresh ETag."""
+    row = run("SELECT version FROM versions WHERE kind=%s AND id=%s", (kind, key), fetchone=True)
+    tag = f"{kind}-{key}-{row['version'] if row else 0}"
+    if request.if_none_match.contains_weak(tag):
+        resp = Response(status=304)
+    else:
+        resp = jsonify(query())
+    resp.set_etag(tag, weak=True)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+def compress(resp):
+    """Negotiated br/gzip for large JSON bodies (feed, search, lists)."""
+    if (resp.status_code != 200 or resp.is_streamed or resp.direct_passthrough
+            or "Content-Encoding" in resp.headers or not resp.is_json):
+        return resp
+    resp.vary.add("Accept-Encoding")
+    body = resp.get_data()
+    if len(body) < MIN_COMPRESS_BYTES:
+        return resp
+    accept = request.accept_encodings
+    if brotli is not None and accept["br"]:
+        resp.set_data(brotli.compress(body, quality=4))
+        resp.headers["Content-Encoding"] = "br"
+    elif accept["gzip"]:
+        resp.set_data(gzip.compress(body, compresslevel=5))
+        resp.headers["Content-Encoding"] = "gzip"
+    return resp
+
+
+def init_app(app):
+    run_ddl(_VERSIONS_DDL)
+    app.json = ORJSONProvider(app)
+    app.after_request(compress)
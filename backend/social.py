@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, session
 from db import run
+from responses import bump, conditional
 from psycopg2 import errors
 # from sqlalchemy import true
 
@@ -11,7 +12,8 @@ def default_stream_id(uid: int) -> int:
        creating it the first time."""
     row = run(
         "SELECT stream_id FROM followstreams "
-        "WHERE user_id=%s AND name='__default__'", (uid,), fetchone=True
+        "WHERE user_id=%s AND name='__default__'", (uid,), fetchone=True,
+        primary=True,   # decides whether we INSERT below, so no replica lag allowed
     )
     if row:
         return row["stream_id"]
@@ -49,22 +51,22 @@ def comment(pid):
            VALUES (%s,%s,%s) RETURNING comment_id,created_at""",
         (uid, pid, txt),
         fetchone=True,
-        commit=True,
+        primary=True,
     )
+    bump("pin", pid)
     return jsonify(c), 201
 
 
 @bp.get("/pins/<int:pid>/comments")
 def list_comments(pid):
-    rows = run(
+    return conditional("pin", pid, lambda: run(
         """SELECT c.comment_id,c.comment_text,c.created_at,
                   u.user_id,u.username
            FROM comments c
            JOIN users u ON c.user_id=u.user_id
-           WHERE pin_id=%s ORDER BY c.created_at ASC""",
+           WHERE pin_id=%s ORDER BY c.created_at ASC, c.comment_id ASC""",
         (pid,),
-    )
-    return jsonify(rows)
+    ))
 
 
 @bp.post("/boards/<int:bid>/follow")
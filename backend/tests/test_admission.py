@@ -0,0 +1,68 @@
+import threading, time
+import pytest
+
+pytest.importorskip("flask")
+import admission
+
+
+@pytest.fixture(autouse=True)
+def scheduler(monkeypatch):
+    monkeypatch.setattr(admission, "ADMIT_SLOTS", 2)
+    monkeypatch.setitem(admission.ROUTES, "t.capped", ("cheap", 1))
+    admission._inflight.clear()
+    admission._waiting.clear()
+    admission._dirty = True
+    yield
+    admission._inflight.clear()
+    admission._waiting.clear()
+
+
+def _waiter(ep, prio, max_wait, results):
+    t = threading.Thread(target=lambda: results.append((ep, admission._acquire(ep, prio, max_wait))))
+    t.start()
+    time.sleep(0.05)   # let it queue so seq order is deterministic
+    return t
+
+
+def test_higher_priority_admitted_first():
+    assert admission._acquire("t.a", 1, 1) and admission._acquire("t.a", 1, 1)
+    results = []
+    threads = [_waiter("t.low", 2, 2, results), _waiter("t.high", 0, 2, results)]
+    admission._release("t.a")
+    time.sleep(0.1)
+    assert results == [("t.high", True)]
+    admission._release("t.a")
+    for t in threads:
+        t.join()
+    assert results == [("t.high", True), ("t.low", True)]
+
+
+def test_capped_route_is_skipped():
+    assert admission._acquire("t.capped", 0, 1)
+    results = []
+    capped = _waiter("t.capped", 0, 0.5, results)
+    t0 = time.monotonic()
+    assert admission._acquire("t.other", 2, 1)   # free slot, head is capped
+    assert time.monotonic() - t0 < 0.2
+    capped.join()
+    assert results == [("t.capped", False)]
+
+
+def test_rejected_after_deadline():
+    assert admission._acquire("t.a", 1, 1) and admission._acquire("t.a", 1, 1)
+    t0 = time.monotonic()
+    assert not admission._acquire("t.b", 0, 0.2)
+    assert 0.2 <= time.monotonic() - t0 < 0.5
+    assert admission._waiting == []
+
+
+def test_admit_returns_503_with_retry_after():
+    from flask import Flask
+    app = Flask(__name__)
+    app.add_url_rule("/x", "t.b", lambda: "ok")
+    assert admission._acquire("t.a", 1, 1) and admission._acquire("t.a", 1, 1)
+    with app.test_request_context("/x"):
+        resp = admission.admit()
+    assert resp.status_code == 503
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert admission.stats["normal.rejected.queue"] >= 1
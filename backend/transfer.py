@@ -0,0 +1,197 @@
+import json
+from flask import Blueprint, Response, request, jsonify, session, stream_with_context
+from psycopg2 import DataError, IntegrityError
+from db import run, get_conn, get_read_conn, commit_conn
+from config import MAX_IMPORT_BYTES, MAX_IMPORT_LINE_BYTES
+from responses import bump
+
+bp = Blueprint("transfer", __name__, url_prefix="/api")
+
+CHUNK_BYTES = 64 * 1024
+ITERSIZE = 2000
+
+# one NDJSON line per row, tagged with "type"; column names are what import expects
+_BOARDS_SQL = """SELECT 'board' AS type, board_id, name, description
+                 FROM boards WHERE {where} ORDER BY board_id"""
+_PINS_SQL = """SELECT 'pin' AS type, p.pin_id, p.board_id, p.tags, p.source_url,
+                      pic.uploaded_url AS image_url, p.created_at
+               FROM   pins p
+               JOIN   boards b ON b.board_id = p.board_id
+               LEFT JOIN pictures pic ON pic.pin_id = p.pin_id
+               WHERE  {where} ORDER BY p.pin_id"""
+_COMMENTS_SQL = """SELECT 'comment' AS type, c.comment_id, c.pin_id, u.username,
+                          c.comment_text, c.created_at
+                   FROM   comments c
+                   JOIN   users u  ON u.user_id = c.user_id
+                   JOIN   pins p   ON p.pin_id = c.pin_id
+                   JOIN   boards b ON b.board_id = p.board_id
+                   WHERE  {where} ORDER BY c.comment_id"""
+
+
+def _ndjson(queries, params):
+    """Yield NDJSON in ~CHUNK_BYTES pieces, reading each query through a named
+       (server-side) cursor so only ITERSIZE rows are in memory at a time."""
+    conn = get_read_conn()
+    conn.rollback()   # SET TRANSACTION must be the first statement of the transaction
+    with conn.cursor() as cur:
+        # one snapshot for all three queries, or rows written in between show up as orphans
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+    buf = []
+    size = 0
+    for i, sql in enumerate(queries):
+        with conn.cursor(name=f"export_{i}") as cur:
+            cur.itersize = ITERSIZE
+            cur.execute(sql, params)
+            for row in cur:
+                line = json.dumps(row, default=str) + "\n"
+                buf.append(line)
+                size += len(line)
+                if size >= CHUNK_BYTES:
+                    yield "".join(buf)
+                    buf, size = [], 0
+    if buf:
+        yield "".join(buf)
+    conn.rollback()   # end the read transaction the named cursors lived in
+
+
+def _export(where, params):
+    queries = [q.format(where=where) for q in (_BOARDS_SQL, _PINS_SQL, _COMMENTS_SQL)]
+    return Response(stream_with_context(_ndjson(queries, params)),
+                    mimetype="application/x-ndjson")
+
+
+@bp.get("/boards/<int:bid>/export")
+def export_board(bid):
+    return _export("b.board_id=%s", (bid,))
+
+
+@bp.get("/users/<int:uid>/export")
+def export_user(uid):
+    return _export("b.user_id=%s", (uid,))
+
+
+class LineTooLong(ValueError):
+    pass
+
+
+class _CopyReader:
+    """File-like adapter feeding request NDJSON lines to COPY ... FROM STDIN
+       (text format, one jsonb column) without buffering the whole upload.
+
+    psycopg2 swallows exceptions raised from read(), so an over-long line ends
+    the COPY early and is reported through `self.error` instead."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buf = b""
+        self.error = None
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buf) < size:
+            line = self.stream.readline(MAX_IMPORT_LINE_BYTES)
+            if not line:
+                break
+            if len(line) == MAX_IMPORT_LINE_BYTES and not line.endswith(b"\n"):
+                self.error = f"line longer than {MAX_IMPORT_LINE_BYTES} bytes"
+                self.buf = b""
+                return b""
+            line = line.strip()
+            if line:
+                self.buf += (line.replace(b"\\", b"\\\\").replace(b"\t", b"\\t")
+                             .replace(b"\r", b"\\r") + b"\n")
+        if size < 0:
+            size = len(self.buf)
+        out, self.buf = self.buf[:size], self.buf[size:]
+        return out
+
+
+# old ids from the file are remapped onto fresh serial values and everything belongs
+# to the importing user; ids in the file mean nothing here, so a comment's original
+# author is kept only as a "@username: " prefix on its text
+_IMPORT_SQL = [
+    """CREATE TEMP TABLE board_map ON COMMIT DROP AS
+       SELECT (line->>'board_id')::int AS old_id,
+              nextval(pg_get_serial_sequence('boards','board_id')) AS new_id, line
+       FROM   import_rows
+       WHERE  line->>'type' = 'board' AND %(bid)s IS NULL""",
+    """INSERT INTO boards (board_id,user_id,name,description)
+       SELECT new_id, %(uid)s, line->>'name', COALESCE(line->>'description','')
+       FROM   board_map""",
+    """CREATE TEMP TABLE pin_map ON COMMIT DROP AS
+       SELECT (r.line->>'pin_id')::int AS old_id,
+              nextval(pg_get_serial_sequence('pins','pin_id')) AS new_id,
+              COALESCE(%(bid)s, bm.new_id) AS board_id, r.line
+       FROM   import_rows r
+       LEFT JOIN board_map bm ON bm.old_id = (r.line->>'board_id')::int
+       WHERE  r.line->>'type' = 'pin' AND COALESCE(%(bid)s, bm.new_id) IS NOT NULL""",
+    """INSERT INTO pins (pin_id,user_id,board_id,tags,source_url,created_at)
+       SELECT new_id, %(uid)s, board_id, line->>'tags', line->>'source_url',
+              COALESCE((line->>'created_at')::timestamp, now())
+       FROM   pin_map""",
+    """INSERT INTO pictures (pin_id,image_blob,uploaded_url)
+       SELECT new_id, NULL, line->>'image_url'
+       FROM   pin_map""",
+    """INSERT INTO comments (user_id,pin_id,comment_text,created_at)
+       SELECT %(uid)s, pm.new_id,
+              CASE WHEN r.line->>'username' IS NULL OR r.line->>'username' = me.username
+                   THEN r.line->>'comment_text'
+                   ELSE '@' || (r.line->>'username') || ': ' || (r.line->>'comment_text')
+              END,
+              COALESCE((r.line->>'created_at')::timestamp, now())
+       FROM   import_rows r
+       JOIN   pin_map pm ON pm.old_id = (r.line->>'pin_id')::int
+       JOIN   users me ON me.user_id = %(uid)s
+       WHERE  r.line->>'type' = 'comment'""",
+]
+
+
+def _import(uid, bid=None):
+    # werkzeug only bounds request.stream by Content-Length, so insist on one
+    if request.content_length is None:
+        return jsonify(error="Content-Length required"), 411
+    if request.content_length > MAX_IMPORT_BYTES:
+        return jsonify(error="upload too large"), 413
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE import_rows (line jsonb) ON COMMIT DROP")
+            reader = _CopyReader(request.stream)
+            cur.copy_expert("COPY import_rows (line) FROM STDIN", reader)
+            if reader.error:
+                raise LineTooLong(reader.error)
+            for sql in _IMPORT_SQL:
+                cur.execute(sql, {"uid": uid, "bid": bid})
+            cur.execute("SELECT (SELECT count(*) FROM board_map) AS boards,"
+                        "       (SELECT count(*) FROM pin_map)   AS pins")
+            counts = cur.fetchone()
+        # imported pins/comments only hang off fresh ids, so just the parent list changes
+        if bid is not None:
+            bump("board", bid, commit=False)
+        elif counts["boards"]:
+            bump("user_boards", uid, commit=False)
+        commit_conn(conn)
+    except (DataError, IntegrityError, LineTooLong) as e:
+        conn.rollback()
+        return jsonify(error="bad ndjson: " + str(e).split("\n")[0]), 400
+    return jsonify(counts), 201
+
+
+@bp.post("/boards/<int:bid>/import")
+def import_board(bid):
+    uid = session.get("uid")
+    if not uid:
+        return jsonify(error="unauth"), 401
+    board = run("SELECT user_id FROM boards WHERE board_id=%s", (bid,), fetchone=True, primary=True)
+    if not board:
+        return jsonify(error="not found"), 404
+    if board["user_id"] != uid:
+        return jsonify(error="forbidden"), 403
+    return _import(uid, bid)
+
+
+@bp.post("/import")
+def import_user():
+    uid = session.get("uid")
+    if not uid:
+        return jsonify(error="unauth"), 401
+    return _import(uid)